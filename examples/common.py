@@ -0,0 +1,46 @@
+# The helpers shared by the example scripts
+
+import json
+import sys
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialises the policy document, using orjson when it is installed
+def policyDocumentAsBytes(policyDocument: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(policyDocument, option=orjson.OPT_INDENT_2)
+    return json.dumps(policyDocument, indent=2).encode('utf-8')
+
+# Reads the input: all the arguments are required and given as --name value or --name=value
+def parseArguments() -> dict[str, str]:
+    requiredArguments = {
+        'databricksAccountId': 'The Databricks account ID',
+        'awsRegion': 'The AWS region where the infrastructure will be deployed',
+        'awsProfileName': 'The profile name for authenticating to the AWS account'
+    }
+    usage = "usage: " + sys.argv[0] + " " + " ".join("--" + name + " <value>" for name in requiredArguments)
+    usage += "\n" + "\n".join("  --" + name + ": " + description for name, description in requiredArguments.items())
+    providedArguments = {}
+    argv = sys.argv[1:]
+    i = 0
+    while i < len(argv):
+        token = argv[i]
+        if token in ('-h', '--help'):
+            print(usage)
+            sys.exit(0)
+        name, separator, value = token.partition('=')
+        if not name.startswith('--') or name[2:] not in requiredArguments:
+            sys.exit(usage + "\nunknown argument: " + token)
+        if not separator:
+            if i + 1 == len(argv):
+                sys.exit(usage + "\nmissing value for the argument: " + name)
+            i += 1
+            value = argv[i]
+        providedArguments[name[2:]] = value
+        i += 1
+    missingArguments = [name for name in requiredArguments if name not in providedArguments]
+    if len(missingArguments) > 0:
+        sys.exit(usage + "\nmissing arguments: " + ", ".join("--" + name for name in missingArguments))
+    return {name: providedArguments[name] for name in requiredArguments}
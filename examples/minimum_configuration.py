@@ -1,29 +1,12 @@
 #!/usr/bin/env python3
 
 import traceback
-import json
-import argparse
 
 from awsinfra4databricks import AWSSession, CloudInfraBuilderForWorkspace, NetworkArchitectureDesignOptions, NetworkArchitectureParameters, CustomerManagedKeysOptions
+from common import parseArguments, policyDocumentAsBytes
 
-# Define the input
-argumentParser = argparse.ArgumentParser()
-argumentParser.add_argument('--databricksAccountId', type=str, required=True, help='The Databricks account ID')
-argumentParser.add_argument('--awsRegion', type=str, required=True, help='The AWS region where the infrastructure will be deployed')
-argumentParser.add_argument('--awsProfileName', type=str, required=True, help='The profile name for authenticating to the AWS account')
-args = argumentParser.parse_args()
-
-try:
-    # Get the Databricks account Id
-    accountId = args.databricksAccountId
-
-    # Starting the AWS session with a Profile
-    aws_region = args.awsRegion
-    awsSession = AWSSession(profileName=args.awsProfileName)
-
-    availabilityZonesIndexes = awsSession.getAvailabilityZoneIndexes(aws_region)
-    availabilityZonesIndexes = availabilityZonesIndexes[0:2] # Keep the first two only
-
+# Defines the infrastructure and saves the template and the policy in files
+def buildMinimumConfiguration(accountId: str, availabilityZonesIndexes: list[int]):
     networkParameters = NetworkArchitectureParameters(
         vpcCidrStartingAddress = '10.10.0.0',
         maxRunningNodesPerSubnet = 1000,
@@ -44,18 +27,29 @@ try:
         networkArchitectureParameters=networkParameters
     )
 
-    cloudFormationScript, inlinePolicyDocument = builder.cloudFormationTemplateBodyParametersAndRequiredPermissions()
     print("Saving the output in the files mininum_configuration.yaml and mininum_configuration.json ")
-    cfFile = open("mininum_configuration.yaml", 'w')
-    cfFile.write(cloudFormationScript)
-    cfFile.close()
-
-    pFile = open("mininum_configuration.json", 'w')
-    pFile.write(json.dumps(inlinePolicyDocument, indent=2))
-    pFile.close()
-
-except Exception as e:
-    print("Exception caught:")
-    print(str(e))
-    print("\nHere is the trace:")
-    print(traceback.format_exc())
\ No newline at end of file
+    inlinePolicyDocument = builder.writeCloudFormationTemplateToFile("mininum_configuration.yaml")
+
+    with open("mininum_configuration.json", 'wb') as pFile:
+        pFile.write(policyDocumentAsBytes(inlinePolicyDocument))
+
+if __name__ == '__main__':
+    args = parseArguments()
+    try:
+        # Get the Databricks account Id
+        accountId = args['databricksAccountId']
+
+        # Starting the AWS session with a Profile
+        aws_region = args['awsRegion']
+        awsSession = AWSSession(profileName=args['awsProfileName'])
+
+        availabilityZonesIndexes = awsSession.getAvailabilityZoneIndexes(aws_region)
+        availabilityZonesIndexes = availabilityZonesIndexes[0:2] # Keep the first two only
+
+        buildMinimumConfiguration(accountId, availabilityZonesIndexes)
+
+    except Exception as e:
+        print("Exception caught:")
+        print(str(e))
+        print("\nHere is the trace:")
+        print(traceback.format_exc())
\ No newline at end of file
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+import traceback
+
+from awsinfra4databricks import AWSSession
+from common import parseArguments
+from minimum_configuration import buildMinimumConfiguration
+from enteprise_standard import buildEnterpriseStandard
+from hubandspoke_full import buildHubAndSpokeFull
+
+# Runs all the examples with a single AWS session, so that the session is only initialised once
+args = parseArguments()
+try:
+    # Get the Databricks account Id
+    accountId = args['databricksAccountId']
+
+    # Starting the AWS session with a Profile
+    aws_region = args['awsRegion']
+    awsSession = AWSSession(profileName=args['awsProfileName'])
+
+    availabilityZonesIndexes = awsSession.getAvailabilityZoneIndexes(aws_region)
+    availabilityZonesIndexes = availabilityZonesIndexes[0:2] # Keep the first two only
+
+    buildMinimumConfiguration(accountId, availabilityZonesIndexes)
+    buildEnterpriseStandard(accountId, availabilityZonesIndexes)
+    buildHubAndSpokeFull(accountId, availabilityZonesIndexes)
+
+except Exception as e:
+    print("Exception caught:")
+    print(str(e))
+    print("\nHere is the trace:")
+    print(traceback.format_exc())
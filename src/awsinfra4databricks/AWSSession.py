@@ -1,130 +1,172 @@
-import boto3
 import json
 import time
-from botocore.exceptions import WaiterError, ClientError
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .AvailabilityZones import availability_zone_counts
 
+# Serialises the policy documents, using orjson when it is installed
+try:
+    import orjson
+    def _jsonDumps(document: dict) -> str:
+        return orjson.dumps(document).decode()
+except ImportError:
+    def _jsonDumps(document: dict) -> str:
+        return json.dumps(document)
+
+# boto3 and botocore are imported when they are first needed, so that templates can be built without paying their import time
 class AWSSession:
 
+    # The maximum number of actions that IAM evaluates in a single policy simulation
+    __MAX_ACTIONS_PER_SIMULATION = 64
+
     # Initialises the session with the credentials
     def __init__(self,
                  profileName:str = None,
                  accessKeyId:str = None,
                  secretAccessKey:str = None,
                  sessionToken:str = None):
+        import boto3
+        from botocore.config import Config
         self.__session = None
         self.__callerArn = None
-        latestError = None
-        try:
-            if profileName is not None:
-                self.__session = boto3.Session(profile_name = profileName)
-            elif (accessKeyId is not None) and (secretAccessKey is not None):
-                if sessionToken is not None:
-                    self.__session = boto3.Session(aws_access_key_id=accessKeyId, aws_secret_access_key=secretAccessKey, aws_session_token=sessionToken)
-                else:
-                    self.__session = boto3.Session(aws_access_key_id=accessKeyId, aws_secret_access_key=secretAccessKey)
+        self.__clients = {}
+        self.__clientsLock = threading.Lock()
+        self.__availabilityZoneCounts = {}
+        # The configuration shared by all the clients: larger connection pools, adaptive retries and TCP keep-alive
+        self.__clientConfig = Config(
+            max_pool_connections=50,
+            retries={'mode': 'adaptive', 'max_attempts': 10},
+            tcp_keepalive=True
+        )
+        if profileName is not None:
+            self.__session = boto3.Session(profile_name = profileName)
+        elif (accessKeyId is not None) and (secretAccessKey is not None):
+            if sessionToken is not None:
+                self.__session = boto3.Session(aws_access_key_id=accessKeyId, aws_secret_access_key=secretAccessKey, aws_session_token=sessionToken)
             else:
-                self.__session = boto3.Session()
-
-            # Check for the validity of the credentials by trying to retrieve the caller ARN
-            callerIdentity = self.__session.client('sts').get_caller_identity()
-            self.__callerArn = callerIdentity["Arn"]
-            if self.__callerArn.startswith('arn:aws:sts::'):
-                accountId = callerIdentity['Account']
-                roleName = self.__callerArn.split('/')[1]
-                self.__callerArn = 'arn:aws:iam::' + accountId + ':role/' + roleName
-        except Exception as e:
-            latestError = str(e)
-
-        # Rethrow the exception
-        if latestError is not None:
-            raise Exception(latestError)
+                self.__session = boto3.Session(aws_access_key_id=accessKeyId, aws_secret_access_key=secretAccessKey)
+        else:
+            self.__session = boto3.Session()
+
+        # Check for the validity of the credentials by trying to retrieve the caller ARN
+        callerIdentity = self.__client('sts').get_caller_identity()
+        self.__callerArn = callerIdentity["Arn"]
+        # An assumed role session (arn:<partition>:sts::<account>:assumed-role/<role>/<session>) is mapped to the ARN of its IAM role
+        # Users and roles that are already given with an IAM ARN are used as they are
+        _, separator, assumedRole = self.__callerArn.partition(':assumed-role/')
+        if separator:
+            accountId = callerIdentity['Account']
+            partition = self.__callerArn.split(':', 2)[1]
+            roleName = assumedRole.split('/', 1)[0]
+            self.__callerArn = f'arn:{partition}:iam::{accountId}:role/{roleName}'
+
+    # Returns the client for a service (and region), creating it only on first use
+    # The boto3 session is not thread safe, so the clients are created under a lock
+    def __client(self, service:str, region:str = None):
+        key = (service, region)
+        client = self.__clients.get(key)
+        if client is None:
+            with self.__clientsLock:
+                client = self.__clients.get(key)
+                if client is None:
+                    client = self.__session.client(service, region_name=region, config=self.__clientConfig)
+                    self.__clients[key] = client
+        return client
         
     # returns the actions that are not permitted by the current caller or the provided role ARN
     def checkPermissionsForActions(self, actionList: list, roleArn:str = None) -> tuple[list[str]]:
         disallowedActions = []
         allowedActions = []
-        latestError = None
         policySourceArn = self.__callerArn if roleArn is None else roleArn
-        try:
-            response = self.__session.client('iam').simulate_principal_policy(
-                PolicySourceArn = policySourceArn,
-                ActionNames=actionList
-            )
-            if 'EvaluationResults' in response:
-                for action in response['EvaluationResults']:
-                    actionName = action['EvalActionName']
-                    if action['EvalDecision'] != 'allowed':
-                        disallowedActions.append(actionName)
-                    else:
-                        allowedActions.append(actionName)
-        except Exception as e:
-            latestError = str(e)
-        # Rethrow the exception
-        if latestError is not None:
-            raise Exception(latestError)
+        # IAM accepts at most 64 actions per simulation, so the list is split and the chunks are simulated concurrently
+        iam = self.__client('iam')
+        chunks = [actionList[i:i+AWSSession.__MAX_ACTIONS_PER_SIMULATION] for i in range(0, len(actionList), AWSSession.__MAX_ACTIONS_PER_SIMULATION)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(
+                lambda chunk: iam.simulate_principal_policy(PolicySourceArn = policySourceArn, ActionNames=chunk),
+                chunks
+            ))
+        for response in responses:
+            for action in response.get('EvaluationResults', []):
+                actionName = action['EvalActionName']
+                if action['EvalDecision'] != 'allowed':
+                    disallowedActions.append(actionName)
+                else:
+                    allowedActions.append(actionName)
         return (allowedActions, disallowedActions)
 
 
     # Retrieves the information of the availability zones in a region
+    # The indexes are the positions 0..N-1 of the zones in the list returned by Fn::GetAZs
+    # The zones of the known regions are counted locally, the others are counted once per session
     def getAvailabilityZoneIndexes(self, region: str):
-        ec2 = self.__session.client('ec2', region_name=region)
-        response = ec2.describe_availability_zones()
-        regions = sorted([
-            z['ZoneName'] for z in response['AvailabilityZones']
-            if z['ZoneType'] == 'availability-zone' and z['ZoneName'].startswith(region) and z['State'] == 'available'
-        ])
-        return [ord((r[len(region):]).lower()) - ord('a') for r in regions]
+        count = availability_zone_counts.get(region)
+        if count is None:
+            count = self.__availabilityZoneCounts.get(region)
+        if count is None:
+            ec2 = self.__client('ec2', region)
+            response = ec2.describe_availability_zones()
+            count = sum(
+                1 for z in response['AvailabilityZones']
+                if z['ZoneType'] == 'availability-zone' and z['State'] == 'available' and z['ZoneName'].startswith(region)
+            )
+            self.__availabilityZoneCounts[region] = count
+        return list(range(count))
 
 
+    # Waits until the role has been deleted, polling with an exponential backoff for at most a minute
     def __waitUntilIamRoleHasBeenDeleted(self, roleName:str) -> bool:
-        iam = self.__session.client('iam')
-        max_attempts=30
-        delay=2
-        for attempt in range(max_attempts):
+        from botocore.exceptions import ClientError
+        iam = self.__client('iam')
+        deadline = time.monotonic() + 60
+        delay = 0.5
+        while True:
             try:
                 iam.get_role(RoleName=roleName)
-            except iam.exceptions.NoSuchEntityException:
-                return True
-            time.sleep(delay)
-        return False
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'NoSuchEntity':
+                    return True
+                raise
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay*2, 10)
 
     def __deleteIamRoleIfExists(self, roleName:str):
-        iam = self.__session.client('iam')
-        errorMessage = None
+        from botocore.exceptions import ClientError
+        iam = self.__client('iam')
         try:
             iam.get_role(RoleName = roleName)
-            # Detach all policies from the role
-            attached_policies = iam.list_attached_role_policies(RoleName=roleName)
-            for policy in attached_policies.get('AttachedPolicies', []):
-                iam.detach_role_policy(RoleName=roleName, PolicyArn=policy['PolicyArn'])            
-            # Delete inline policies
-            inline_policies = iam.list_role_policies(RoleName=roleName)
-            for policy_name in inline_policies.get('PolicyNames', []):
-                iam.delete_role_policy(RoleName=roleName, PolicyName=policy_name)
+            # Detach all policies and delete the inline policies of the role, going through all the pages of the listings
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                futures = []
+                for page in iam.get_paginator('list_attached_role_policies').paginate(RoleName=roleName):
+                    futures += [executor.submit(iam.detach_role_policy, RoleName=roleName, PolicyArn=policy['PolicyArn']) for policy in page['AttachedPolicies']]
+                for page in iam.get_paginator('list_role_policies').paginate(RoleName=roleName):
+                    futures += [executor.submit(iam.delete_role_policy, RoleName=roleName, PolicyName=policy_name) for policy_name in page['PolicyNames']]
+                # Rethrow any error raised in the workers
+                for future in futures: future.result()
             # Delete the role
             iam.delete_role(RoleName=roleName)
         except ClientError as e:
             if e.response['Error']['Code'] != 'NoSuchEntity':
-                errorMessage = str(e)
-        if errorMessage is not None: raise Exception(errorMessage)
-        self.__waitUntilIamRoleHasBeenDeleted(roleName)
+                raise
+        if not self.__waitUntilIamRoleHasBeenDeleted(roleName):
+            raise Exception("The IAM role " + roleName + " has not been deleted in time")
 
     def __waitForRoleCreation(self, roleName:str) -> bool:
-        iam = self.__session.client('iam')
-        max_attempts=30
-        delay=2
-        for attempt in range(max_attempts):
-            try:
-                iam.get_role(RoleName=roleName)
-                return True
-            except iam.exceptions.NoSuchEntityException:
-                time.sleep(delay)
-        return False
+        from botocore.exceptions import WaiterError
+        try:
+            self.__client('iam').get_waiter('role_exists').wait(RoleName=roleName, WaiterConfig={'Delay': 2, 'MaxAttempts': 30})
+            return True
+        except WaiterError:
+            return False
 
     # Creates or replaces an IAM role to be assumed by CloudFormation
     def createOrReplaceIamRoleForCloudFormation(self, roleName:str, inlinePolicy: dict) -> str:
         self.__deleteIamRoleIfExists(roleName)
-        iam = self.__session.client('iam')
+        iam = self.__client('iam')
         # Define the trust policy
         trust_policy = {
             "Version": "2012-10-17",
@@ -138,24 +180,17 @@ class AWSSession:
                 }
             ]
         }
-        roleArn = None
-        errorMessage = None
-        try:
-            # Create the IAM role
-            roleArn = iam.create_role(
-                RoleName=roleName,
-                AssumeRolePolicyDocument=json.dumps(trust_policy)
-            )['Role']['Arn']
-            # Attach the inline policy to the role
-            iam.put_role_policy(
-                RoleName=roleName,
-                PolicyName='PrivilegesToCloudFormation',
-                PolicyDocument=json.dumps(inlinePolicy)
-            )
-        except ClientError as e:
-            errorMessage = str(e)
-
-        if errorMessage is not None: raise Exception(errorMessage)
+        # Create the IAM role
+        roleArn = iam.create_role(
+            RoleName=roleName,
+            AssumeRolePolicyDocument=_jsonDumps(trust_policy)
+        )['Role']['Arn']
+        # Attach the inline policy to the role
+        iam.put_role_policy(
+            RoleName=roleName,
+            PolicyName='PrivilegesToCloudFormation',
+            PolicyDocument=_jsonDumps(inlinePolicy)
+        )
         self.__waitForRoleCreation(roleName)
         return roleArn
 
@@ -168,7 +203,8 @@ class AWSSession:
             region: str,
             bucketForCFTemplate: str = None,
             roleArn: str = None) -> bool:
-        cf_client = self.__session.client('cloudformation', region_name=region)
+        from botocore.exceptions import WaiterError, ClientError
+        cf_client = self.__client('cloudformation', region)
         try:
             kwargs = {
                 "StackName": stackName,
@@ -176,9 +212,10 @@ class AWSSession:
             }
             if roleArn is not None: kwargs["RoleARN"] = roleArn
             if bucketForCFTemplate is not None:
-                s3 = self.__session.client('s3', region_name=region)
+                s3 = self.__client('s3', region)
+                # S3 offers read-after-write consistency, so the template can be referenced as soon as it is uploaded
                 s3.put_object(Body=templateBody.encode(), Bucket=bucketForCFTemplate, Key=stackName+'.yaml')
-                time.sleep(1)
+                # The global host of the bucket is used, since the bucket can be in a different region than the stack
                 templateURL = f"https://{bucketForCFTemplate}.s3.amazonaws.com/{stackName}.yaml"
                 kwargs['TemplateURL'] = templateURL
             else:
@@ -209,3 +246,13 @@ class AWSSession:
         except ClientError as e:
             print(f"Error: {e}")
             return False
+
+
+    # Creates several cloudformation stacks concurrently
+    # Each specification holds the keyword arguments of createCloudFormationStack
+    # Returns whether each stack, identified by its name, has been created successfully
+    def createCloudFormationStacksParallel(self, specs: list[dict]) -> dict[str, bool]:
+        if len(specs) == 0: return {}
+        with ThreadPoolExecutor(max_workers=len(specs)) as executor:
+            futures = {spec['stackName']: executor.submit(self.createCloudFormationStack, **spec) for spec in specs}
+            return {stackName: future.result() for stackName, future in futures.items()}
@@ -0,0 +1,20 @@
+# The number of availability zones that every account sees in the regions supported by Databricks
+# The indexes of the zones are used with Fn::GetAZs, so a region with N zones has the indexes 0 to N-1
+availability_zone_counts = {
+    "ap-northeast-1": 3,
+    "ap-northeast-2": 4,
+    "ap-south-1": 3,
+    "ap-southeast-1": 3,
+    "ap-southeast-2": 3,
+    "ca-central-1": 3,
+    "eu-central-1": 3,
+    "eu-west-1": 3,
+    "eu-west-2": 3,
+    "eu-west-3": 3,
+    "sa-east-1": 3,
+    "us-east-1": 6,
+    "us-east-2": 3,
+    "us-gov-west-1": 3,
+    "us-west-1": 2,
+    "us-west-2": 4
+}
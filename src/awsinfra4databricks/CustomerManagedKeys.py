@@ -1,4 +1,5 @@
 from enum import Enum
+from .DatabricksAddresses import databricks_aws_account_root_arn
 
 # Generates the fragment for CloudFormation for the managed services
 def managedServicesPolicyStatement(databricksIdRefName: str) -> list[dict]:
@@ -7,7 +8,7 @@ def managedServicesPolicyStatement(databricksIdRefName: str) -> list[dict]:
             "Sid": "Allow Databricks to use KMS key for managed services in the control plane",
             "Effect": "Allow",
             "Principal": {
-                "AWS": "arn:aws:iam::414351767826:root"
+                "AWS": databricks_aws_account_root_arn
             },
             "Action": [
                 "kms:Encrypt",
@@ -29,7 +30,7 @@ def workspaceStoragePolicyStatement(databricksIdRefName: str, iamRoleResourceNam
             "Sid": "Allow Databricks to use KMS key for DBFS",
             "Effect": "Allow",
             "Principal":{
-                "AWS":"arn:aws:iam::414351767826:root"
+                "AWS":databricks_aws_account_root_arn
             },
             "Action": [
                 "kms:Encrypt",
@@ -49,7 +50,7 @@ def workspaceStoragePolicyStatement(databricksIdRefName: str, iamRoleResourceNam
             "Sid": "Allow Databricks to use KMS key for DBFS (Grants)",
             "Effect": "Allow",
             "Principal":{
-                "AWS":"arn:aws:iam::414351767826:root"
+                "AWS":databricks_aws_account_root_arn
             },
             "Action": [
                 "kms:CreateGrant",
@@ -1,3 +1,10 @@
+from types import MappingProxyType
+
+# The AWS account of the Databricks control plane, and the principals of that account that are trusted by the workspace resources
+databricks_aws_account_id = "414351767826"
+databricks_aws_account_root_arn = "arn:aws:iam::" + databricks_aws_account_id + ":root"
+unity_catalog_master_role_arn = "arn:aws:iam::" + databricks_aws_account_id + ":role/unity-catalog-prod-UCMasterRole-14S5ZJVKOTYTL"
+
 privatelink_endpoints = {
     "ap-northeast-1": {
         "workspace": "com.amazonaws.vpce.ap-northeast-1.vpce-svc-02691fd610d24fd64",
@@ -140,22 +147,22 @@ databricks_regions = {
     }
 }
 
+# The addresses and the endpoint services of the Databricks regions, as used in the Mappings of the templates
+# They are computed once, when the module is imported, and are read-only since they are shared by all the templates
+databricks_addresses_mappings = MappingProxyType({
+    region: MappingProxyType({
+        "workspace": addresses["workspace"].split(',')[0],
+        "backend": addresses["backend"],
+        "workspaceEP": privatelink_endpoints[region]["workspace"],
+        "backendEP": privatelink_endpoints[region]["backend"]
+    })
+    for region, addresses in databricks_regions.items()
+})
+
 class DatabricksAddresses:
     def __init__(self):
-        self.__mappings = {}
-        for region in databricks_regions:
-            addresses = databricks_regions[region]
-            cp = addresses["workspace"].split(',')[0]
-            sccr = addresses["backend"]
-            endpoints = privatelink_endpoints[region]
-            cp_ep = endpoints["workspace"]
-            sccr_ep = endpoints["backend"]
-            self.__mappings[region] = {
-                "workspace": cp,
-                "backend": sccr,
-                "workspaceEP": cp_ep,
-                "backendEP": sccr_ep
-            }
+        self.__mappings = databricks_addresses_mappings
     
-    def mappings(self) -> dict[str:dict[str:str]]:
+    # Returns a read-only view of the mappings
+    def mappings(self) -> MappingProxyType:
         return self.__mappings